@@ -67,6 +67,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'tickets.routers.PrimaryPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'django_propair.urls'
@@ -103,6 +104,23 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. POSTGRES_REPLICA_HOSTS=replica1,replica2. List and detail
+# views of events, tickets and orders read from them; see tickets/routers.py.
+REPLICA_DATABASES = []
+for index, host in enumerate(env.list('POSTGRES_REPLICA_HOSTS', default=[])):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['tickets.routers.PrimaryReplicaRouter']
+
+# How long a client keeps reading from the primary after it wrote something.
+REPLICA_PIN_SECONDS = 15
+
+# Failed, expired and refunded orders older than this are moved to the
+# archive tables by `manage.py archive_orders`.
+ORDER_ARCHIVE_AFTER_DAYS = env.int('ORDER_ARCHIVE_AFTER_DAYS', default=30)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -122,6 +140,33 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Optional store tracking reservation holds outside the database, see
+# tickets/holds.py: 'tickets.holds.CacheHoldStore' needs a cache shared by all
+# processes in CACHES, e.g. Redis; per-process caches and LocalHoldStore are
+# refused. Unset means expiry is checked against Order.expires_at only. The
+# crontab also runs an hourly --full sweep for holds the store lost or never saw.
+HOLD_STORE_BACKEND = env('HOLD_STORE_BACKEND', default=None)
+HOLD_STORE_CACHE = 'default'
+
+# Password hashing cost and concurrency, see tickets/hashers.py. Lowering
+# PASSWORD_HASH_ITERATIONS makes signups and logins cheaper at the price of
+# weaker protection for leaked hashes; existing hashes are upgraded or
+# downgraded on the next successful login. The pooled hasher owns the
+# "pbkdf2_sha256" algorithm: Django looks hashers up by algorithm name, so
+# listing Django's own PBKDF2PasswordHasher too would take logins off the pool.
+PASSWORD_HASHERS = [
+    'tickets.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = env.int('PASSWORD_HASH_ITERATIONS', default=390000)
+PASSWORD_HASHING_WORKERS = env.int('PASSWORD_HASHING_WORKERS', default=4)
+PASSWORD_HASHING_QUEUE = env.int('PASSWORD_HASHING_QUEUE', default=32)
+# Seconds a request waits for a free hashing slot before answering 503.
+PASSWORD_HASHING_TIMEOUT = 5
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -0,0 +1,33 @@
+"""
+Slim settings for management commands (the cron container) and API-only
+workers: the same configuration as settings.py without the admin, sessions,
+messages and static files apps, their middleware, or the browsable API.
+
+Use it with DJANGO_SETTINGS_MODULE=django_propair.settings_slim and compare
+with `python manage.py profile_startup`.
+"""
+from .settings import *  # noqa: F401,F403
+
+UNUSED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+# The API authenticates with JWT, so no session, CSRF or message handling.
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'tickets.routers.PrimaryPinningMiddleware',
+]
+
+ROOT_URLCONF = 'django_propair.urls_slim'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ('rest_framework.renderers.JSONRenderer',),
+}
+
+TEMPLATES = []
@@ -0,0 +1,24 @@
+"""
+Settings for `python manage.py test --settings=django_propair.settings_test`:
+two SQLite databases stand in for the PostgreSQL primary and a read replica.
+"""
+import os
+
+for name in ('POSTGRES_DB', 'POSTGRES_USER', 'POSTGRES_PASSWORD'):
+    os.environ.setdefault(name, 'test')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-primary.sqlite3',
+    },
+    'replica_0': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-replica.sqlite3',
+    },
+}
+REPLICA_DATABASES = ['replica_0']
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,6 @@
+"""URLconf for django_propair.settings_slim: the API without the admin site."""
+from django.urls import path, include
+
+urlpatterns = [
+    path('', include('tickets.urls')),
+]
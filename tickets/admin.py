@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import User, Event, Ticket, Order
+from .models import User, Event, TicketTier, Ticket, Order, EventSalesDaily, OrderTransition, ArchivedOrder, ArchivedTicket
 
 admin.site.register(User)
 admin.site.register(Event)
+admin.site.register(TicketTier)
 admin.site.register(Ticket)
 admin.site.register(Order)
+admin.site.register(EventSalesDaily)
+admin.site.register(OrderTransition)
+admin.site.register(ArchivedOrder)
+admin.site.register(ArchivedTicket)
@@ -0,0 +1,144 @@
+import csv
+
+from datetime import datetime, time
+
+from .models import Order, Ticket, ticket_price
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import make_aware, is_naive
+
+EXPORT_KINDS = ("orders", "tickets")
+EXPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_CHUNK_SIZE = 2000
+
+ORDER_COLUMNS = [
+    ("id", "id"),
+    ("user_id", "user_id"),
+    ("user_email", "user__email"),
+    ("status", "status"),
+    ("created_at", "created_at"),
+    ("expires_at", "expires_at"),
+    ("ticket_count", "ticket_count"),
+    ("total_price", "total_price"),
+]
+
+TICKET_COLUMNS = [
+    ("id", "id"),
+    ("order_id", "order_id"),
+    ("order_status", "order__status"),
+    ("order_created_at", "order__created_at"),
+    ("user_id", "user_id"),
+    ("user_email", "user__email"),
+    ("event_id", "event_id"),
+    ("event_name", "event__name"),
+    ("event_date", "event__date"),
+    ("tier_id", "tier_id"),
+    ("tier_name", "tier__name"),
+    ("quantity", "quantity"),
+    ("ticket_price", "unit_price"),
+    ("currency", "event__currency"),
+]
+
+
+class Echo:
+    """ File-like object that hands back what is written, for streaming csv rows. """
+
+    def write(self, value):
+        return value
+
+
+def parse_status(value):
+    """ Accept a status either by name ("confirmed") or by its integer value. """
+    if value in (None, ""):
+        return None
+    if isinstance(value, int) or str(value).isdigit():
+        status = int(value)
+        if status not in Order.Status.values:
+            raise ValueError(f"Unknown order status: {value}")
+        return status
+    try:
+        return Order.Status[str(value).upper()].value
+    except KeyError:
+        raise ValueError(f"Unknown order status: {value}")
+
+
+def parse_moment(value, end_of_day=False):
+    """ Parse an ISO date or datetime; plain dates cover the whole day. """
+    if value in (None, ""):
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if is_naive(moment):
+        moment = make_aware(moment)
+    return moment
+
+
+def _filter_orders(queryset, prefix, status, since, until):
+    filters = {}
+    if status is not None:
+        filters[f"{prefix}status"] = status
+    if since is not None:
+        filters[f"{prefix}created_at__gte"] = since
+    if until is not None:
+        filters[f"{prefix}created_at__lte"] = until
+    return queryset.filter(**filters)
+
+
+def order_rows(status=None, since=None, until=None):
+    """ Orders with their user and aggregated ticket totals, one query. """
+    line_price = ExpressionWrapper(
+        F("tickets__quantity") * ticket_price("tickets__"),
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+    queryset = Order.objects.annotate(
+        ticket_count=Coalesce(Sum("tickets__quantity"), Value(0)),
+        total_price=Coalesce(Sum(line_price), Value(0), output_field=DecimalField(max_digits=20, decimal_places=2)),
+    )
+    queryset = _filter_orders(queryset, "", status, since, until)
+    return queryset.order_by("id").values_list(*[lookup for _, lookup in ORDER_COLUMNS])
+
+
+def ticket_rows(status=None, since=None, until=None):
+    """ Tickets joined with their order, user and event, one query. """
+    queryset = Ticket.objects.annotate(unit_price=ticket_price())
+    queryset = _filter_orders(queryset, "order__", status, since, until)
+    return queryset.order_by("id").values_list(*[lookup for _, lookup in TICKET_COLUMNS])
+
+
+def export_lines(kind, fmt, status=None, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the export line by line. Rows are read with ``iterator()`` inside a
+    transaction, so PostgreSQL uses a plain server-side cursor that hands rows
+    over as they are fetched. Outside a transaction the cursor would be opened
+    WITH HOLD and the whole result materialized before the first row.
+    """
+    if kind == "orders":
+        columns, rows = ORDER_COLUMNS, order_rows(status, since, until)
+    elif kind == "tickets":
+        columns, rows = TICKET_COLUMNS, ticket_rows(status, since, until)
+    else:
+        raise ValueError(f"Unknown export kind: {kind}")
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    header = [name for name, _ in columns]
+    with transaction.atomic():
+        rows = rows.iterator(chunk_size=chunk_size)
+        if fmt == "csv":
+            writer = csv.writer(Echo())
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow(row)
+        else:
+            encoder = DjangoJSONEncoder()
+            for row in rows:
+                yield encoder.encode(dict(zip(header, row))) + "\n"
@@ -0,0 +1,64 @@
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-ups and logins right now, please try again shortly."
+    default_code = "password_hashing_busy"
+
+
+def _pool():
+    """ Create the shared hashing pool on first use, sized from settings. """
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASHING_WORKERS
+                _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_QUEUE)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hashing")
+    return _executor, _slots
+
+
+def run_in_pool(func, *args):
+    """
+    Run a CPU-bound hashing call on the bounded pool and wait for its result.
+    The calling request thread blocks meanwhile; the pool only caps how many
+    hashes run at once at PASSWORD_HASHING_WORKERS, so a burst of sign-ups and
+    logins cannot take every core. When the queue is full the caller gets a
+    503 instead of piling up.
+    """
+    executor, slots = _pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+        raise PasswordHashingBusy()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the iteration count taken from
+    PASSWORD_HASH_ITERATIONS and the hashing done on the bounded pool.
+    Hashes stay "pbkdf2_sha256", so existing passwords keep working and are
+    re-hashed to the configured cost on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        return run_in_pool(super().encode, password, salt, iterations)
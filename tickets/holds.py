@@ -0,0 +1,189 @@
+import heapq
+import threading
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_hold_store():
+    """
+    The configured hold store, or None when HOLD_STORE_BACKEND is unset and
+    holds are only tracked by ``Order.expires_at``.
+    """
+    global _store
+    backend = getattr(settings, "HOLD_STORE_BACKEND", None)
+    if not backend:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(backend)()
+    return _store
+
+
+@receiver(setting_changed)
+def reset_hold_store(setting, **kwargs):
+    """ Drop the cached store when tests change the hold store settings. """
+    global _store
+    if setting.startswith("HOLD_STORE"):
+        _store = None
+
+
+class BaseHoldStore(ABC):
+    """
+    Tracks the deadline of every pending order so expiry checks and scans do
+    not need the database. Postgres stays the source of truth: a hold missing
+    from the store just means the caller falls back to ``Order.expires_at``.
+    """
+
+    @abstractmethod
+    def add(self, order_id, expires_at):
+        """ Track a hold, replacing any earlier deadline for the order. """
+
+    @abstractmethod
+    def remove(self, order_id):
+        """ Forget a hold once its order has left PENDING. """
+
+    @abstractmethod
+    def deadline(self, order_id):
+        """ The hold's deadline, or None if the store does not know it. """
+
+    @abstractmethod
+    def pop_expired(self, moment=None):
+        """ Remove and return the ids of holds whose deadline has passed. """
+
+
+class LocalHoldStore(BaseHoldStore):
+    """
+    In-process store: a dict of deadlines plus a deadline-ordered heap.
+    Only suitable when orders are created and expired in the same process,
+    which a deployment never does: the cron job expires holds from its own
+    container. It is therefore refused unless HOLD_STORE_ALLOW_LOCAL is set,
+    as the tests and stress_reservations do.
+    """
+
+    def __init__(self):
+        if not getattr(settings, "HOLD_STORE_ALLOW_LOCAL", False):
+            raise ImproperlyConfigured(
+                "LocalHoldStore only sees holds made in its own process, so the cron job "
+                "would never expire them. Use CacheHoldStore with a shared cache."
+            )
+        self._deadlines = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def add(self, order_id, expires_at):
+        with self._lock:
+            self._deadlines[order_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, order_id))
+
+    def remove(self, order_id):
+        with self._lock:
+            # The heap entry is dropped lazily by pop_expired.
+            self._deadlines.pop(order_id, None)
+
+    def deadline(self, order_id):
+        return self._deadlines.get(order_id)
+
+    def pop_expired(self, moment=None):
+        moment = moment or now()
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= moment:
+                expires_at, order_id = heapq.heappop(self._heap)
+                if self._deadlines.get(order_id) == expires_at:
+                    del self._deadlines[order_id]
+                    expired.append(order_id)
+        return expired
+
+
+class CacheHoldStore(BaseHoldStore):
+    """
+    Store shared by every process through a Django cache (HOLD_STORE_CACHE).
+
+    Each hold is a key holding its deadline. For the expiry scan, holds are
+    also appended to one bucket per minute of deadline using atomic counters,
+    so ``pop_expired`` reads only the buckets that have fully elapsed since
+    the last scan. Holds therefore expire up to a minute late.
+    """
+    BUCKET_SECONDS = 60
+    prefix = "holds"
+
+    def __init__(self):
+        alias = getattr(settings, "HOLD_STORE_CACHE", "default")
+        self.cache = caches[alias]
+        # The cron job expires holds from its own process, so a cache that is
+        # not shared would silently never expire anything.
+        if isinstance(self.cache, (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                f"CacheHoldStore needs a cache shared by all processes, but the {alias!r} cache "
+                f"is a {type(self.cache).__name__}. Point HOLD_STORE_CACHE at Redis or Memcached."
+            )
+        # Keep keys a while past the deadline so a late scan still finds them.
+        self.grace = getattr(settings, "HOLD_STORE_GRACE_SECONDS", 3600)
+
+    def _key(self, *parts):
+        return ":".join([self.prefix, *map(str, parts)])
+
+    def _bucket(self, moment):
+        return int(moment.timestamp()) // self.BUCKET_SECONDS
+
+    def _timeout(self, expires_at):
+        return max(int((expires_at - now()).total_seconds()), 0) + self.grace
+
+    def add(self, order_id, expires_at):
+        timeout = self._timeout(expires_at)
+        self.cache.set(self._key("order", order_id), expires_at.timestamp(), timeout)
+
+        bucket = self._bucket(expires_at)
+        counter = self._key("bucket", bucket, "size")
+        self.cache.add(counter, 0, timeout)
+        slot = self.cache.incr(counter)
+        self.cache.set(self._key("bucket", bucket, slot), order_id, timeout)
+
+    def remove(self, order_id):
+        self.cache.delete(self._key("order", order_id))
+
+    def deadline(self, order_id):
+        timestamp = self.cache.get(self._key("order", order_id))
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+    def pop_expired(self, moment=None):
+        moment = moment or now()
+        last_full_bucket = self._bucket(moment) - 1
+        cursor_key = self._key("cursor")
+        first_bucket = self.cache.get(cursor_key)
+        if first_bucket is None:
+            first_bucket = last_full_bucket - self.grace // self.BUCKET_SECONDS
+
+        expired = []
+        for bucket in range(first_bucket, last_full_bucket + 1):
+            size = self.cache.get(self._key("bucket", bucket, "size")) or 0
+            slots = [self._key("bucket", bucket, slot) for slot in range(1, size + 1)]
+            order_ids = list(self.cache.get_many(slots).values())
+            deadlines = self.cache.get_many([self._key("order", order_id) for order_id in order_ids])
+            for order_id in order_ids:
+                timestamp = deadlines.get(self._key("order", order_id))
+                # Skip holds removed since, or re-added with a later deadline.
+                if timestamp is not None and self._bucket(datetime.fromtimestamp(timestamp, tz=timezone.utc)) <= bucket:
+                    expired.append(order_id)
+            self.cache.delete_many(slots + [self._key("bucket", bucket, "size")])
+
+        self.cache.set(cursor_key, last_full_bucket + 1, None)
+        self.cache.delete_many([self._key("order", order_id) for order_id in expired])
+        return expired
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now, timedelta
+
+from tickets.models import Order
+
+class Command(BaseCommand):
+    help = 'Moves old failed, expired and refunded orders to the archive tables in throttled batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS, help='Archive orders created more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.5, help='Seconds to sleep between batches')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        older_than = now() - timedelta(days=options['days'])
+        started = time.monotonic()
+        batches = archived = 0
+
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = Order.archive(older_than, batch_size=options['batch_size'])
+            if not moved:
+                break
+            batches += 1
+            archived += moved
+            self.stdout.write(f'Batch {batches}: archived {moved} orders')
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} orders in {batches} batches ({time.monotonic() - started:.2f}s)'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tickets.models import EventSalesDaily
+
+class Command(BaseCommand):
+    help = 'Fills in missing per-event daily sales rollups from existing orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='events', help='Only backfill this event (repeatable)')
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete the existing rollups first. Refunded and expired counts cannot be rebuilt and are lost.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = EventSalesDaily.backfill(events=options['events'], reset=options['reset'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} daily sales rows'))
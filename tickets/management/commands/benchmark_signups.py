@@ -0,0 +1,51 @@
+import os
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tickets.models import User
+from tickets.serializers import RegisterSerializer
+
+class Command(BaseCommand):
+    help = 'Measures sign-ups per second (and per core) through the registration serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8, help='Simulated request threads')
+        parser.add_argument('--keep', action='store_true', help='Keep the created users')
+
+    def handle(self, *args, **options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+
+        def signup(index):
+            try:
+                serializer = RegisterSerializer(data={
+                    'username': f'{prefix}-{index}',
+                    'email': f'{prefix}-{index}@example.com',
+                    'password': 'benchmark-password',
+                })
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            finally:
+                connection.close()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(signup, range(options['signups'])))
+        elapsed = time.monotonic() - started
+
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        rate = options['signups'] / elapsed
+        self.stdout.write(
+            f'{options["signups"]} sign-ups in {elapsed:.2f}s with {options["concurrency"]} threads, '
+            f'{settings.PASSWORD_HASH_ITERATIONS} iterations, {settings.PASSWORD_HASHING_WORKERS} hashing workers'
+        )
+        self.stdout.write(self.style.SUCCESS(f'{rate:.1f} sign-ups/s, {rate / cores:.1f} per core ({cores} cores)'))
+
+        if not options['keep']:
+            User.objects.filter(username__startswith=prefix).delete()
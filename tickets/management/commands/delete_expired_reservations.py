@@ -4,6 +4,12 @@ from tickets.models import Order
 
 class Command(BaseCommand):
     help = 'Expires orders that have passed their expiration time'
+    # Runs from cron every five minutes, where cold start dominates: the system
+    # checks would import the URLconf and with it every view, DRF and requests.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Scan the database instead of only the holds reported by the hold store')
 
     def handle(self, *args, **kwargs):
-        Order.expire_all_orders()
\ No newline at end of file
+        Order.expire_all_orders(full_scan=kwargs['full'])
\ No newline at end of file
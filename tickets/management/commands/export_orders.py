@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.exports import EXPORT_KINDS, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, export_lines, parse_status, parse_moment
+
+class Command(BaseCommand):
+    help = 'Streams orders or tickets to CSV or JSON lines for reporting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', nargs='?', choices=EXPORT_KINDS, default='orders')
+        parser.add_argument('--output', choices=EXPORT_FORMATS, default='csv', help='Output format')
+        parser.add_argument('--status', help='Order status name or value, e.g. "confirmed"')
+        parser.add_argument('--since', help='Only orders created on or after this ISO date/datetime')
+        parser.add_argument('--until', help='Only orders created on or before this ISO date/datetime')
+        parser.add_argument('--file', help='Write to this path instead of stdout')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            order_status = parse_status(options['status'])
+            since = parse_moment(options['since'])
+            until = parse_moment(options['until'], end_of_day=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = export_lines(
+            options['kind'], options['output'],
+            status=order_status, since=since, until=until,
+            chunk_size=options['chunk_size'],
+        )
+
+        if options['file']:
+            with open(options['file'], 'w', newline='') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
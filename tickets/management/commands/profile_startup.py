@@ -0,0 +1,77 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+PROBES = {
+    # What the cron's delete_expired_reservations pays: it skips the system checks.
+    'command': 'import django; django.setup()',
+    # What a web worker pays before serving its first request.
+    'worker': (
+        'from django.core.wsgi import get_wsgi_application; get_wsgi_application(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+}
+
+class Command(BaseCommand):
+    help = 'Measures cold-start time and import time per package for one or more settings modules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'settings_modules', nargs='*',
+            default=['django_propair.settings', 'django_propair.settings_slim'],
+        )
+        parser.add_argument('--probe', choices=PROBES, default='command')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help='Packages to list per settings module')
+
+    def handle(self, *args, **options):
+        for module in options['settings_modules']:
+            timings = []
+            packages = defaultdict(int)
+            for _ in range(options['runs']):
+                elapsed, imports = self.run_probe(module, PROBES[options['probe']])
+                timings.append(elapsed)
+                for package, microseconds in imports.items():
+                    packages[package] += microseconds
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{module} ({options["probe"]}): median {statistics.median(timings) * 1000:.0f} ms '
+                f'over {options["runs"]} runs'
+            ))
+            ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+            for package, microseconds in ranked[:options['top']]:
+                self.stdout.write(f'  {microseconds / options["runs"] / 1000:8.1f} ms  {package}')
+
+    def run_probe(self, module, code):
+        """ Run the probe in a fresh interpreter; return wall time and self import time per package. """
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': module}
+        started = time.monotonic()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        elapsed = time.monotonic() - started
+
+        imports = defaultdict(int)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            imports[self.package(name.strip())] += int(self_us)
+        return elapsed, imports
+
+    @staticmethod
+    def package(name):
+        """ Group django.contrib apps individually, everything else by top-level package. """
+        parts = name.split('.')
+        if parts[:2] == ['django', 'contrib']:
+            return '.'.join(parts[:3])
+        if parts[0] == 'django':
+            return '.'.join(parts[:2])
+        return parts[0]
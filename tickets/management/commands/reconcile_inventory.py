@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from tickets.models import Event, TicketTier
+
+class Command(BaseCommand):
+    help = 'Reports events and tiers whose available tickets drifted from their tickets on hold, and optionally repairs them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Fix mismatches; without it the command is a dry run')
+        parser.add_argument('--batch-size', type=int, default=500, help='Events or tiers locked and repaired per transaction')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip while scanning')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        found = repaired = 0
+        repair_seconds = 0.0
+        for model in (Event, TicketTier):
+            label = model._meta.verbose_name.capitalize()
+            mismatched = (
+                model.with_expected_availability()
+                .filter(Q(available_tickets__isnull=True) | ~Q(available_tickets=F('expected_available')))
+                .order_by('pk')
+                .values_list('pk', 'available_tickets', 'expected_available')
+            )
+
+            batch = []
+            for pk, available, expected in mismatched.iterator(chunk_size=options['chunk_size']):
+                found += 1
+                self.stdout.write(f'{label} {pk}: available {available}, expected {expected}')
+                if options['repair']:
+                    batch.append(pk)
+                    if len(batch) >= options['batch_size']:
+                        batch_started = time.monotonic()
+                        repaired += self.repair(model, batch)
+                        repair_seconds += time.monotonic() - batch_started
+                        batch = []
+
+            if batch:
+                batch_started = time.monotonic()
+                repaired += self.repair(model, batch)
+                repair_seconds += time.monotonic() - batch_started
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {found} mismatched events and tiers, repaired {repaired} '
+            f'in {elapsed:.2f}s ({repair_seconds:.2f}s repairing)'
+        ))
+
+    def repair(self, model, pks):
+        """ Lock a batch of events or tiers and recompute them, since holds may have changed since the scan. """
+        repaired = 0
+        with transaction.atomic():
+            list(model.objects.select_for_update().filter(pk__in=pks).order_by('pk').values_list('pk'))
+            for pk, available, expected in (
+                model.with_expected_availability()
+                .filter(pk__in=pks)
+                .values_list('pk', 'available_tickets', 'expected_available')
+            ):
+                if available != expected:
+                    model.objects.filter(pk=pk).update(available_tickets=max(expected, 0))
+                    repaired += 1
+        return repaired
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tickets.models import Event, TicketTier, OrderTransition
+
+class Command(BaseCommand):
+    help = 'Rebuilds event and tier ticket availability from the order transition log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='events', help='Only replay this event (repeatable)')
+        parser.add_argument('--apply', action='store_true', help='Write the replayed availability back to the events and tiers')
+
+    def handle(self, *args, **options):
+        held = OrderTransition.replay(events=options['events'])
+        event_ids = options['events'] or sorted({event_id for event_id, _ in held})
+        # Orders placed before the log existed would look like free tickets.
+        unlogged = OrderTransition.unlogged_events(event_ids)
+        for event_id in sorted(unlogged):
+            self.stdout.write(self.style.WARNING(f'Event {event_id}: skipped, it has tickets the log does not cover'))
+        event_ids = [event_id for event_id in event_ids if event_id not in unlogged]
+        mismatches = replayed = 0
+
+        with transaction.atomic():
+            # (model, rows, key into the replayed holds)
+            inventories = [
+                (Event, Event.objects.only('id', 'total_tickets', 'available_tickets').filter(pk__in=event_ids),
+                 lambda event: (event.id, None)),
+                (TicketTier, TicketTier.objects.only('id', 'event_id', 'total_tickets', 'available_tickets')
+                 .filter(event_id__in=event_ids), lambda tier: (tier.event_id, tier.id)),
+            ]
+            for model, rows, key in inventories:
+                label = model._meta.verbose_name.capitalize()
+                if options['apply']:
+                    rows = rows.select_for_update()
+                for row in rows.iterator():
+                    replayed += 1
+                    expected = row.total_tickets - held.get(key(row), 0)
+                    if expected == row.available_tickets:
+                        continue
+                    mismatches += 1
+                    self.stdout.write(f'{label} {row.id}: available {row.available_tickets}, log says {expected}')
+                    if options['apply']:
+                        model.objects.filter(pk=row.pk).update(available_tickets=expected)
+
+        action = 'Repaired' if options['apply'] else 'Found'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {mismatches} mismatched events and tiers out of {replayed} replayed'
+        ))
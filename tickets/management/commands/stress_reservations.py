@@ -0,0 +1,311 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from collections import Counter, defaultdict
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count, Sum
+from django.test import override_settings
+from django.utils.timezone import now, timedelta
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from tickets.holds import get_hold_store
+from tickets.models import User, Event, TicketTier, Ticket, Order, OrderTransition
+from tickets.views import OrderViewSet
+
+ACTIVE = [Order.Status.PENDING, Order.Status.CONFIRMED]
+
+class Command(BaseCommand):
+    help = (
+        'Hammers reserve, purchase, cancel and expiry from many threads against the '
+        'configured database, then checks the inventory invariants. Creates its own '
+        'event and users; run it against a local database only. On SQLite the file is '
+        'switched to WAL mode for the run and back to its previous journal mode afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16, help='Worker threads, one user each')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+        parser.add_argument('--tickets', type=int, default=200, help='Tickets on sale (per tier with --tiers)')
+        parser.add_argument('--tiers', type=int, default=0, help='Also sell through this many tiers')
+        parser.add_argument('--expire-every', type=float, default=0.5, help='Seconds between forced expiry sweeps')
+        parser.add_argument(
+            '--hold-store', help='Hold store backend to use instead of HOLD_STORE_BACKEND, '
+            'e.g. tickets.holds.LocalHoldStore'
+        )
+        parser.add_argument(
+            '--max-error-rate', type=float, default=0.01,
+            help='Fail when more than this fraction of calls raise or return a 5xx'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the generated event, users and orders')
+
+    @staticmethod
+    def sqlite_write_lock(sender, connection, **kwargs):
+        """
+        Make each thread's SQLite connection wait for the write lock. A plain
+        BEGIN takes the lock only at the first write, and a transaction that
+        has already read cannot wait for it, so it fails with "database is
+        locked" at once. BEGIN IMMEDIATE takes the lock up front instead.
+        """
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout = 5000')
+        connection._start_transaction_under_autocommit = (
+            lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+        )
+
+    def handle(self, *args, **options):
+        backend = options['hold_store'] or getattr(settings, 'HOLD_STORE_BACKEND', None)
+        # The workers and the expiry thread share this process, so an
+        # in-process store is fine here.
+        with override_settings(HOLD_STORE_BACKEND=backend, HOLD_STORE_ALLOW_LOCAL=True):
+            self.run(options)
+
+    def run(self, options):
+        journal_mode = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+                cursor.execute('PRAGMA journal_mode=WAL')
+            connection_created.connect(self.sqlite_write_lock)
+            # The connection already open missed the signal.
+            self.sqlite_write_lock(None, connection)
+        try:
+            self.stress(options)
+        finally:
+            if journal_mode is not None:
+                connection_created.disconnect(self.sqlite_write_lock)
+                # WAL mode persists in the database file; put back what it had.
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+
+    def stress(self, options):
+
+        tag = f'stress-{uuid.uuid4().hex[:8]}'
+        event = Event.objects.create(
+            name=tag, date=now() + timedelta(days=30), location='stress',
+            ticket_price=10, currency='EUR', total_tickets=options['tickets'],
+        )
+        tiers = [
+            TicketTier.objects.create(event=event, name=f'tier-{index}', price=20 + index, total_tickets=options['tickets'])
+            for index in range(options['tiers'])
+        ]
+        users = [
+            User.objects.create(username=f'{tag}-{index}', email=f'{tag}-{index}@example.com')
+            for index in range(options['concurrency'])
+        ]
+
+        self.stats = defaultdict(list)
+        self.outcomes = Counter()
+        self.lock = threading.Lock()
+        stop = threading.Event()
+
+        threads = [threading.Thread(target=self.worker, args=(user, event, tiers, stop)) for user in users]
+        threads.append(threading.Thread(target=self.expirer, args=(users, options['expire_every'], stop)))
+        lock_samples = []
+        if connection.vendor == 'postgresql':
+            threads.append(threading.Thread(target=self.lock_monitor, args=(lock_samples, stop)))
+
+        started = time.monotonic()
+        # Payments succeed or fail at random without calling the payment API.
+        with mock.patch('requests.get', side_effect=self.fake_payment):
+            for thread in threads:
+                thread.start()
+            time.sleep(options['duration'])
+            stop.set()
+            for thread in threads:
+                thread.join()
+        elapsed = time.monotonic() - started
+
+        self.report(elapsed, lock_samples)
+        violations = self.check_invariants(event, tiers, users)
+        error_rate = self.error_rate()
+
+        if not options['keep']:
+            order_ids = list(Order.objects.filter(user__in=users).values_list('pk', flat=True))
+            OrderTransition.objects.filter(order_id__in=order_ids).delete()
+            event.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        if violations:
+            raise CommandError(f'{len(violations)} inventory invariants violated')
+        if error_rate > options['max_error_rate']:
+            raise CommandError(
+                f'{error_rate:.1%} of calls failed (limit {options["max_error_rate"]:.1%}), '
+                'so the invariants were checked under little real contention'
+            )
+        self.stdout.write(self.style.SUCCESS('All inventory invariants hold'))
+
+    @staticmethod
+    def fake_payment(*args, **kwargs):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'result': random.choice([True, False])}
+        return response
+
+    def call(self, name, view, request, user, **kwargs):
+        """ Run one API call, recording its latency and status code or exception. """
+        force_authenticate(request, user=user)
+        started = time.monotonic()
+        try:
+            outcome = view(request, **kwargs).status_code
+        except Exception as e:
+            outcome = type(e).__name__
+        latency = time.monotonic() - started
+        with self.lock:
+            self.stats[name].append(latency)
+            self.outcomes[(name, outcome)] += 1
+
+    def worker(self, user, event, tiers, stop):
+        factory = APIRequestFactory()
+        reserve = OrderViewSet.as_view({'post': 'reserve'})
+        purchase = OrderViewSet.as_view({'post': 'purchase'})
+        cancel = OrderViewSet.as_view({'delete': 'cancel'})
+        try:
+            while not stop.is_set():
+                roll = random.random()
+                if roll < 0.55:
+                    line = {'event': event.pk, 'quantity': random.choice([0, 1, 2, 3, 4, 5])}
+                    if tiers and random.random() < 0.5:
+                        line['tier'] = random.choice(tiers).pk
+                    request = factory.post('/api/orders/reserve/', {'tickets': [line]}, format='json')
+                    self.call('reserve', reserve, request, user)
+                    continue
+
+                status = Order.Status.PENDING if roll < 0.85 else Order.Status.CONFIRMED
+                order_id = Order.objects.filter(user=user, status=status).values_list('pk', flat=True).first()
+                if order_id is None:
+                    continue
+                if status == Order.Status.PENDING:
+                    request = factory.post(f'/api/orders/{order_id}/purchase/')
+                    self.call('purchase', purchase, request, user, pk=order_id)
+                else:
+                    request = factory.delete(f'/api/orders/{order_id}/cancel/')
+                    self.call('cancel', cancel, request, user, pk=order_id)
+        finally:
+            connection.close()
+
+    def expirer(self, users, interval, stop):
+        """
+        Push some pending holds into the past and run the expiry sweep, like the
+        cron job. With a hold store, sweeps alternate between the store and a
+        full database scan.
+        """
+        store = get_hold_store()
+        sweeps = 0
+        try:
+            while not stop.wait(interval):
+                pending = Order.objects.filter(user__in=users, status=Order.Status.PENDING)
+                due = list(pending.order_by('?').values_list('pk', flat=True)[:max(len(users) // 4, 1)])
+                deadline = now() - timedelta(seconds=1)
+                Order.objects.filter(pk__in=due).update(expires_at=deadline)
+                if store is not None:
+                    for order_id in due:
+                        store.add(order_id, deadline)
+
+                full_scan = store is None or sweeps % 2 == 1
+                name = 'expire' if full_scan else 'expire-store'
+                sweeps += 1
+                started = time.monotonic()
+                try:
+                    Order.expire_all_orders(full_scan=full_scan)
+                    outcome = 'ok'
+                except Exception as e:
+                    outcome = type(e).__name__
+                with self.lock:
+                    self.stats[name].append(time.monotonic() - started)
+                    self.outcomes[(name, outcome)] += 1
+        finally:
+            connection.close()
+
+    def lock_monitor(self, samples, stop, interval=0.05):
+        """ Sample how many backends are waiting on a lock (PostgreSQL only). """
+        try:
+            with connection.cursor() as cursor:
+                while not stop.wait(interval):
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                    )
+                    samples.append(cursor.fetchone()[0])
+        finally:
+            connection.close()
+
+    def report(self, elapsed, lock_samples):
+        total = sum(len(latencies) for latencies in self.stats.values())
+        store = getattr(settings, 'HOLD_STORE_BACKEND', None) or 'no hold store'
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{total} operations in {elapsed:.1f}s ({total / elapsed:.0f} ops/s) on {connection.vendor}, {store}'
+        ))
+        for name, latencies in sorted(self.stats.items()):
+            latencies = sorted(latencies)
+            p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+            outcomes = ', '.join(
+                f'{outcome}: {count}' for (op, outcome), count in sorted(self.outcomes.items(), key=str) if op == name
+            )
+            self.stdout.write(
+                f'  {name:12} {len(latencies):6} calls  p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+                f'p95 {p95 * 1000:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms  [{outcomes}]'
+            )
+        if connection.vendor == 'sqlite' and any(outcome == 'OperationalError' for _, outcome in self.outcomes):
+            self.stdout.write(
+                '  OperationalError on SQLite is "database is locked": a writer waited longer than the '
+                'busy timeout. Lower --concurrency, or use PostgreSQL for realistic contention numbers.'
+            )
+        if lock_samples:
+            waiting = sum(lock_samples) * 0.05
+            self.stdout.write(
+                f'  lock waits: up to {max(lock_samples)} backends waiting, '
+                f'~{waiting:.2f}s of backend time spent waiting on locks'
+            )
+
+    def error_rate(self):
+        """ Fraction of calls that raised or returned a server error. """
+        calls = sum(self.outcomes.values())
+        failed = sum(
+            count for (_, outcome), count in self.outcomes.items()
+            if isinstance(outcome, str) and outcome != 'ok' or isinstance(outcome, int) and outcome >= 500
+        )
+        rate = failed / calls if calls else 0.0
+        self.stdout.write(f'  {failed} of {calls} calls failed ({rate:.1%})')
+        return rate
+
+    def check_invariants(self, event, tiers, users):
+        violations = []
+
+        def held(**filters):
+            return Ticket.objects.filter(order__status__in=ACTIVE, **filters).aggregate(total=Sum('quantity'))['total'] or 0
+
+        for inventory, taken in [(event, held(event=event, tier__isnull=True))] + [(tier, held(tier=tier)) for tier in tiers]:
+            inventory.refresh_from_db()
+            if taken > inventory.total_tickets:
+                violations.append(f'{inventory}: oversold, {taken} held of {inventory.total_tickets}')
+            if inventory.available_tickets != inventory.total_tickets - taken:
+                violations.append(
+                    f'{inventory}: available {inventory.available_tickets}, '
+                    f'expected {inventory.total_tickets - taken}'
+                )
+
+        orphans = Ticket.objects.filter(event=event).exclude(order__status__in=ACTIVE).count()
+        if orphans:
+            violations.append(f'{orphans} tickets belong to failed, expired or refunded orders')
+
+        doubled = (
+            Order.objects.filter(user__in=users, status=Order.Status.PENDING)
+            .values('user').annotate(orders=Count('pk')).filter(orders__gt=1).count()
+        )
+        if doubled:
+            violations.append(f'{doubled} users have more than one pending order')
+
+        for violation in violations:
+            self.stdout.write(self.style.ERROR(f'  {violation}'))
+        return violations
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.13 on 2026-10-19 13:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_remove_order_total_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.IntegerField(choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Failed'), (4, 'Expired'), (5, 'Refund')], default=1),
+        ),
+        migrations.CreateModel(
+            name='EventSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reserved', models.IntegerField(default=0)),
+                ('sold', models.PositiveIntegerField(default=0)),
+                ('refunded', models.PositiveIntegerField(default=0)),
+                ('expired', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='tickets.event')),
+            ],
+            options={
+                'ordering': ['event', 'day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='eventsalesdaily',
+            constraint=models.UniqueConstraint(fields=('event', 'day'), name='unique_event_sales_day'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-19 13:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_eventsalesdaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.IntegerField(choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Failed'), (4, 'Expired'), (5, 'Refund')])),
+                ('to_status', models.IntegerField(choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Failed'), (4, 'Expired'), (5, 'Refund')])),
+                ('tickets', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transitions', to='tickets.order')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
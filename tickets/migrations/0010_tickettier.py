@@ -0,0 +1,41 @@
+# Generated by Django 4.1.13 on 2026-10-19 13:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import tickets.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_archivedorder_archivedticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('total_tickets', models.PositiveIntegerField()),
+                ('available_tickets', models.PositiveIntegerField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiers', to='tickets.event')),
+            ],
+            bases=(tickets.models.TicketInventory, models.Model),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='tier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='tickets.tickettier'),
+        ),
+        migrations.AddField(
+            model_name='archivedticket',
+            name='tier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_tickets', to='tickets.tickettier'),
+        ),
+        migrations.AddConstraint(
+            model_name='tickettier',
+            constraint=models.UniqueConstraint(fields=('event', 'name'), name='unique_tier_name_per_event'),
+        ),
+    ]
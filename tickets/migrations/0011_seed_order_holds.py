@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Sum
+
+ACTIVE = [1, 2]  # Order.Status.PENDING, Order.Status.CONFIRMED
+
+
+def seed_holds(apps, schema_editor):
+    """
+    Log a hold for the tickets of every active order placed before the
+    transition log existed, so replaying the log accounts for them.
+    """
+    Order = apps.get_model('tickets', 'Order')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    OrderTransition = apps.get_model('tickets', 'OrderTransition')
+
+    unlogged = (
+        Order.objects.filter(status__in=ACTIVE)
+        .exclude(pk__in=OrderTransition.objects.values('order_id'))
+        .values_list('pk', flat=True)
+    )
+    lines = {}
+    for line in (
+        Ticket.objects.filter(order_id__in=unlogged)
+        .values('order_id', 'event_id', 'tier_id')
+        .annotate(total_quantity=Sum('quantity'))
+        .order_by('order_id')
+        .iterator()
+    ):
+        lines.setdefault(line['order_id'], []).append(
+            {'event': line['event_id'], 'tier': line['tier_id'], 'quantity': line['total_quantity']}
+        )
+    OrderTransition.objects.bulk_create([
+        OrderTransition(order_id=order_id, from_status=1, to_status=1, tickets=tickets)
+        for order_id, tickets in lines.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0010_tickettier'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_holds, migrations.RunPython.noop),
+    ]
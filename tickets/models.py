@@ -1,10 +1,19 @@
 
+import threading
+
+from contextlib import contextmanager
+from decimal import Decimal
+
 from django.utils.timezone import now, timedelta
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MaxValueValidator, MinValueValidator
 
+from .holds import get_hold_store
+
 class User(AbstractUser):
     username = models.CharField(max_length=50, unique=True)
     email = models.EmailField(_('email address'), unique=True)
@@ -26,15 +35,11 @@ class User(AbstractUser):
         return self.username
 
 
-class Event(models.Model):
-    name = models.CharField(max_length=255)
-    description = models.TextField(blank=True, null=True)
-    date = models.DateTimeField()
-    location = models.CharField(max_length=100)
-    ticket_price = models.DecimalField(max_digits=15, decimal_places=2)
-    currency = models.CharField(max_length=10)
-    total_tickets = models.PositiveIntegerField()
-    available_tickets = models.PositiveIntegerField(blank=True, null=True)
+class TicketInventory:
+    """ Counter logic shared by the rows tickets are taken from: events and their tiers. """
+
+    # Which of the row's tickets are taken from its counter.
+    held_tickets = Q()
 
     def save(self, *args, **kwargs):
         """ Ensure available tickets match total tickets on creation. """
@@ -43,42 +48,120 @@ class Event(models.Model):
         super().save(*args, **kwargs)
 
     def reserve_tickets(self, quantity):
-        """ Temporarily reduce available tickets when a user selects tickets. """
-        if self.available_tickets >= quantity:
-            self.available_tickets -= quantity
-            self.save()
-        else:
+        """
+        Temporarily reduce available tickets when a user selects tickets. The
+        check and the decrement are one conditional UPDATE, so two concurrent
+        reservations cannot both pass on the same stale count.
+        """
+        taken = type(self).objects.filter(pk=self.pk, available_tickets__gte=quantity).update(
+            available_tickets=F("available_tickets") - quantity
+        )
+        if not taken:
             raise ValueError("Not enough tickets available")
+        self.refresh_from_db(fields=["available_tickets"])
 
     def release_tickets(self, quantity):
         """ Restore available tickets if order expires or fails. """
-        self.available_tickets += quantity
-        self.save()
+        type(self).objects.filter(pk=self.pk).update(available_tickets=F("available_tickets") + quantity)
+        self.refresh_from_db(fields=["available_tickets"])
+
+    @classmethod
+    def with_expected_availability(cls):
+        """
+        Annotate each row with ``expected_available``: total tickets minus its
+        tickets held by pending and confirmed orders, in one grouped query.
+        """
+        held = Coalesce(
+            Sum(
+                "tickets__quantity",
+                filter=cls.held_tickets & Q(
+                    tickets__order__status__in=[Order.Status.PENDING, Order.Status.CONFIRMED],
+                ),
+            ),
+            Value(0),
+        )
+        return cls.objects.annotate(expected_available=F("total_tickets") - held)
+
+
+def ticket_price(prefix=""):
+    """ Price of a ticket: its tier's price if it has one, otherwise the event's. """
+    return Coalesce(F(f"{prefix}tier__price"), F(f"{prefix}event__ticket_price"))
+
+
+class Event(TicketInventory, models.Model):
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    date = models.DateTimeField()
+    location = models.CharField(max_length=100)
+    ticket_price = models.DecimalField(max_digits=15, decimal_places=2)
+    currency = models.CharField(max_length=10)
+    total_tickets = models.PositiveIntegerField()
+    available_tickets = models.PositiveIntegerField(blank=True, null=True)
+
+    # Tickets bought through a tier come out of the tier's counter instead.
+    held_tickets = Q(tickets__tier__isnull=True)
 
     def __str__(self):
         return self.name
 
+class TicketTier(TicketInventory, models.Model):
+    """
+    A seat category of an event (VIP, standing, ...) with its own price and
+    counter, so reservations for different tiers lock different rows.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="tiers")
+    name = models.CharField(max_length=100)
+    price = models.DecimalField(max_digits=15, decimal_places=2)
+    total_tickets = models.PositiveIntegerField()
+    available_tickets = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["event", "name"], name="unique_tier_name_per_event"),
+        ]
+
+    def __str__(self):
+        return f"{self.event.name} - {self.name}"
+
 class Ticket(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="tickets")
+    tier = models.ForeignKey(
+        TicketTier, on_delete=models.CASCADE, related_name="tickets", blank=True, null=True
+    )
     order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="tickets")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tickets")
     quantity = models.PositiveIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
 
+    @property
+    def inventory(self):
+        """ The row tickets are taken from: the tier if one was chosen, otherwise the event. """
+        return self.tier if self.tier_id else self.event
+
+    @property
+    def price(self):
+        return self.tier.price if self.tier_id else self.event.ticket_price
+
     def save(self, *args, **kwargs):
         """ Adjust ticket availability correctly when updating a reservation. """
         if self.pk:  # If updating an existing ticket
             old_quantity = Ticket.objects.get(pk=self.pk).quantity
 
             if old_quantity != self.quantity:
-                if (self.event.available_tickets + old_quantity) - self.quantity >= 0:
-                    self.event.release_tickets(old_quantity)
-                    self.event.reserve_tickets(self.quantity)
+                if self.quantity > old_quantity:
+                    try:
+                        self.inventory.reserve_tickets(self.quantity - old_quantity)
+                    except ValueError:
+                        raise ValueError(f"Not enough tickets available for event {self.event.name}.")
                 else:
-                    raise ValueError(f"Not enough tickets available for event {self.event.name}.")
+                    self.inventory.release_tickets(old_quantity - self.quantity)
+                EventSalesDaily.record(self.event_id, reserved=self.quantity - old_quantity)
+                OrderTransition.log_hold(self.order_id, self.event_id, self.tier_id, self.quantity - old_quantity)
         else:
-            self.event.reserve_tickets(self.quantity)
+            self.inventory.reserve_tickets(self.quantity)
+            EventSalesDaily.record(self.event_id, reserved=self.quantity)
+            OrderTransition.log_hold(self.order_id, self.event_id, self.tier_id, self.quantity)
         super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -87,7 +170,9 @@ class Ticket(models.Model):
         event = self.event
 
         # Increase available tickets before deleting the ticket
-        event.release_tickets(self.quantity)
+        self.inventory.release_tickets(self.quantity)
+        EventSalesDaily.record(event.id, reserved=-self.quantity)
+        OrderTransition.log_hold(order.id, event.id, self.tier_id, -self.quantity)
 
         super().delete(*args, **kwargs)
 
@@ -106,56 +191,465 @@ class Order(models.Model):
         EXPIRED = 4, "Expired"
         REFUND = 5, "Refund"
 
+    TERMINAL = (Status.FAILED, Status.EXPIRED, Status.REFUND)
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     status = models.IntegerField(choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
-    
+
+    class Meta:
+        indexes = [
+            # Finds ended orders to archive without scanning the whole table.
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
+
     @property
     def total_price(self):
         """Calculate the total price of all tickets in the order."""
-        return sum(ticket.event.ticket_price * ticket.quantity for ticket in self.tickets.all())
+        return sum(ticket.price * ticket.quantity for ticket in self.tickets.select_related("event", "tier"))
 
     def save(self, *args, **kwargs):
         """ Set expiration to 15 minutes from creation. """
-        if not self.pk:
+        creating = not self.pk
+        if creating:
             self.expires_at = now() + timedelta(minutes=15)
         super().save(*args, **kwargs)
 
+        store = get_hold_store()
+        if creating and store is not None:
+            transaction.on_commit(lambda: store.add(self.pk, self.expires_at))
+
+    def hold_expired(self):
+        """ Whether the reservation hold has run out, using the hold store when configured. """
+        store = get_hold_store()
+        deadline = store.deadline(self.pk) if store is not None else None
+        return now() >= (deadline or self.expires_at)
+
+    def ticket_totals(self):
+        """ Ticket quantity and value of this order, grouped by event and tier. """
+        return self.tickets.values("event_id", "tier_id").annotate(
+            total_quantity=Sum("quantity"),
+            total_revenue=Sum(F("quantity") * ticket_price()),
+        ).order_by()
+
+    def _transition(self, status):
+        """
+        Move the order from the status this instance last saw to ``status``
+        with one conditional UPDATE, so when two requests end the same order
+        (a failed payment and the expiry sweep, say) only one of them wins.
+        Logs the transition and returns the order's ticket totals, or None
+        when another request changed the order first.
+        """
+        old_status = self.status
+        with transaction.atomic():
+            if not Order.objects.filter(pk=self.pk, status=old_status).update(status=status):
+                self.refresh_from_db(fields=["status"])
+                return None
+            self.status = status
+            totals = list(self.ticket_totals())
+            if old_status == self.Status.CONFIRMED:
+                # Refunds give back what was paid, not the tickets' current price.
+                sold = OrderTransition.sold_revenue([self.pk])
+                for line in totals:
+                    line["total_revenue"] = sold.get(
+                        (self.pk, line["event_id"], line["tier_id"]), line["total_revenue"]
+                    )
+            OrderTransition.log(self.pk, old_status, status, totals)
+
+        store = get_hold_store()
+        if old_status == self.Status.PENDING and store is not None:
+            transaction.on_commit(lambda: store.remove(self.pk))
+        return totals
+
+    def _end_order(self, status):
+        """
+        Move to a final status, return the order's tickets to their events and
+        drop them. Returns the released totals, or None if the order had
+        already been changed by another request.
+        """
+        with transaction.atomic():
+            totals = self._transition(status)
+            if totals is None:
+                return None
+            for line in totals:
+                if line["tier_id"]:
+                    inventory = TicketTier.objects.filter(pk=line["tier_id"])
+                else:
+                    inventory = Event.objects.filter(pk=line["event_id"])
+                inventory.update(available_tickets=F("available_tickets") + line["total_quantity"])
+            self.tickets.all().delete()
+        return totals
+
     def confirm_order(self):
-        """ Finalize ticket purchase when payment is successful. """
-        self.status = self.Status.CONFIRMED
-        self.save()
+        """ Finalize ticket purchase when payment is successful. Returns whether the order was confirmed. """
+        totals = self._transition(self.Status.CONFIRMED)
+        for line in totals or []:
+            EventSalesDaily.record(line["event_id"], sold=line["total_quantity"], revenue=line["total_revenue"])
+        return totals is not None
 
     def fail_order(self):
         """ Restore tickets if payment fails. """
-        for ticket in self.tickets.all():
-            ticket.event.release_tickets(ticket.quantity)
-        self.status = self.Status.FAILED
-        self.tickets.all().delete()
-        self.save()
+        self._end_order(self.Status.FAILED)
 
     def expire_order(self):
         """ Restore tickets if order expires. """
-        if self.status == self.Status.PENDING and now() >= self.expires_at:
-            self.fail_order()
-            self.status = self.Status.EXPIRED
-            self.save()
+        if self.status == self.Status.PENDING and self.hold_expired():
+            for line in self._end_order(self.Status.EXPIRED) or []:
+                EventSalesDaily.record(line["event_id"], expired=line["total_quantity"])
 
     def refund_order(self):
-        """ Restore tickets if order is deleted. """
-        if self.status == self.Status.CONFIRMED:
-            self.fail_order()
-            self.status = self.Status.REFUND
-            self.save()
+        """ Restore tickets if order is deleted. Returns whether the order was refunded. """
+        if self.status != self.Status.CONFIRMED:
+            return False
+        totals = self._end_order(self.Status.REFUND)
+        for line in totals or []:
+            EventSalesDaily.record(line["event_id"], refunded=line["total_quantity"], revenue=-line["total_revenue"])
+        return totals is not None
+
+    @classmethod
+    def expire_all_orders(cls, full_scan=False, batch_size=500):
+        """
+        Expire all pending orders that have passed their expiration time. With a
+        hold store only the orders it reports as expired are loaded, by primary
+        key; ``full_scan`` also catches holds the store never saw.
+        """
+        store = get_hold_store()
+        if store is None or full_scan:
+            expired_orders = cls.objects.filter(status=cls.Status.PENDING, expires_at__lte=now())
+        else:
+            expired_orders = cls.objects.filter(pk__in=store.pop_expired(), status=cls.Status.PENDING)
+
+        order_ids = list(expired_orders.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(order_ids), batch_size):
+            # Each batch's statuses and log rows commit together, and the event
+            # and tier rows it touched are unlocked before the next batch.
+            with transaction.atomic(), OrderTransition.batched():
+                for order in cls.objects.filter(pk__in=order_ids[start:start + batch_size]):
+                    order.expire_order()
 
     @classmethod
-    def expire_all_orders(cls):
-        """Expire all pending orders that have passed their expiration time."""
-        expired_orders = cls.objects.filter(status=cls.Status.PENDING, expires_at__lte=now())
-        
-        for order in expired_orders:
-            order.expire_order()
+    def archive(cls, older_than, batch_size=1000):
+        """
+        Move one batch of failed, expired and refunded orders created before
+        ``older_than`` (and any tickets they still have) to the archive tables.
+        Returns the number of orders moved.
+        """
+        with transaction.atomic():
+            orders = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(status__in=cls.TERMINAL, created_at__lt=older_than)
+                .order_by("pk")[:batch_size]
+            )
+            if not orders:
+                return 0
+            order_ids = [order.pk for order in orders]
+
+            ArchivedOrder.objects.bulk_create([
+                ArchivedOrder(
+                    id=order.pk, user_id=order.user_id, status=order.status,
+                    created_at=order.created_at, expires_at=order.expires_at,
+                )
+                for order in orders
+            ], ignore_conflicts=True)
+            ArchivedTicket.objects.bulk_create(ArchivedTicket.lines_for(orders))
+
+            # Bulk deletes skip Ticket.delete, so inventory is left alone.
+            Ticket.objects.filter(order_id__in=order_ids).delete()
+            cls.objects.filter(pk__in=order_ids).delete()
+        return len(orders)
 
     def __str__(self):
         return f"Order {self.id} - {self.user.email} - {self.get_status_display()}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Failed, expired and refunded orders moved out of the hot Order table by
+    ``Order.archive``. Keeps the original primary key.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_orders")
+    status = models.IntegerField(choices=Order.Status.choices)
+    created_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=now)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def total_price(self):
+        return sum(ticket.ticket_price * ticket.quantity for ticket in self.tickets.all())
+
+    def __str__(self):
+        return f"Archived order {self.id} - {self.get_status_display()}"
+
+
+class ArchivedTicket(models.Model):
+    """
+    Ticket line of an archived order, with the price it was sold at. Orders
+    drop their tickets when they end, so the lines come from the order's
+    final entry in the transition log.
+    """
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="tickets")
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="archived_tickets")
+    tier = models.ForeignKey(
+        TicketTier, on_delete=models.SET_NULL, related_name="archived_tickets", blank=True, null=True
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_tickets")
+    quantity = models.PositiveIntegerField()
+    ticket_price = models.DecimalField(max_digits=15, decimal_places=2)
+
+    @classmethod
+    def lines_for(cls, orders):
+        """
+        Unsaved archive lines for ended orders: the tickets of each order's
+        final transition, priced as they were sold when it was confirmed.
+        """
+        order_ids = [order.pk for order in orders]
+        final_lines = {}
+        transitions = (
+            OrderTransition.objects.filter(order_id__in=order_ids, to_status__in=Order.TERMINAL)
+            .order_by("id")
+            .values_list("order_id", "tickets")
+        )
+        for order_id, tickets in transitions:
+            final_lines[order_id] = tickets
+        sold_revenue = OrderTransition.sold_revenue(order_ids)
+
+        # Unconfirmed orders and older log rows without revenue fall back to
+        # the price logged with the final transition, then to today's price.
+        lines = [(order, line) for order in orders for line in final_lines.get(order.pk, [])]
+        tier_prices = dict(TicketTier.objects.filter(
+            pk__in={line["tier"] for _, line in lines if line.get("tier")}
+        ).values_list("pk", "price"))
+        event_prices = dict(Event.objects.filter(
+            pk__in={line["event"] for _, line in lines}
+        ).values_list("pk", "ticket_price"))
+
+        archived = []
+        for order, line in lines:
+            if line["event"] not in event_prices:
+                continue  # The event has been deleted since.
+            tier_id = line.get("tier") if line.get("tier") in tier_prices else None
+            revenue = sold_revenue.get((order.pk, line["event"], line.get("tier")))
+            if revenue is None and line.get("revenue") is not None:
+                revenue = Decimal(line["revenue"])
+            if revenue is not None:
+                price = revenue / line["quantity"]
+            else:
+                price = tier_prices.get(tier_id) or event_prices[line["event"]]
+            archived.append(cls(
+                order_id=order.pk, event_id=line["event"], tier_id=tier_id,
+                user_id=order.user_id, quantity=line["quantity"], ticket_price=price,
+            ))
+        return archived
+
+    def __str__(self):
+        return f"Archived ticket {self.id} for order {self.order_id}"
+
+
+class EventSalesDaily(models.Model):
+    """
+    Per-event, per-day sales counters, kept up to date by the order state
+    transitions so dashboards read one row per day instead of every order.
+    Revenue is net of refunds and in the event's currency.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="daily_sales")
+    day = models.DateField()
+    reserved = models.IntegerField(default=0)
+    sold = models.PositiveIntegerField(default=0)
+    refunded = models.PositiveIntegerField(default=0)
+    expired = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["event", "day"], name="unique_event_sales_day"),
+        ]
+        ordering = ["event", "day"]
+
+    @classmethod
+    def record(cls, event_id, **deltas):
+        """
+        Add the given deltas to today's row for the event once the surrounding
+        transaction commits, so the shared rollup row is not locked for the
+        whole reservation.
+        """
+        day = now().date()
+        transaction.on_commit(lambda: cls.add(event_id, day, **deltas))
+
+    @classmethod
+    def add(cls, event_id, day, **deltas):
+        """ Add the given deltas to the event's row for the day, creating it if needed. """
+        deltas = {field: value for field, value in deltas.items() if value}
+        if not deltas:
+            return
+        row, _ = cls.objects.get_or_create(event_id=event_id, day=day)
+        cls.objects.filter(pk=row.pk).update(**{field: F(field) + value for field, value in deltas.items()})
+
+    @classmethod
+    def backfill(cls, events=None, reset=False):
+        """
+        Fill in the (event, day) rows that have no rollup yet from the orders
+        still on record, and return how many were created. Existing rows are
+        left alone, since they also carry refunded and expired counts that
+        cannot be recovered: those orders lose their tickets when they end.
+        Backfilled rows are bucketed by order creation day rather than by the
+        day of the transition. ``reset`` first deletes every selected row.
+        """
+        tickets = Ticket.objects.filter(order__status__in=[Order.Status.PENDING, Order.Status.CONFIRMED])
+        rows = cls.objects.all()
+        if events is not None:
+            tickets = tickets.filter(event__in=events)
+            rows = rows.filter(event__in=events)
+        if reset:
+            rows.delete()
+            existing = set()
+        else:
+            existing = set(rows.values_list("event_id", "day"))
+
+        created = set()
+        for totals in (
+            tickets.values("event_id", "order__created_at__date", "order__status")
+            .annotate(total_quantity=Sum("quantity"), total_revenue=Sum(F("quantity") * ticket_price()))
+            .order_by()
+            .iterator()
+        ):
+            key = (totals["event_id"], totals["order__created_at__date"])
+            if key in existing:
+                continue
+            deltas = {"reserved": totals["total_quantity"]}
+            if totals["order__status"] == Order.Status.CONFIRMED:
+                deltas.update(sold=totals["total_quantity"], revenue=totals["total_revenue"])
+            cls.add(*key, **deltas)
+            created.add(key)
+        return len(created)
+
+    def __str__(self):
+        return f"{self.event.name} - {self.day}"
+
+
+_transition_buffer = threading.local()
+
+class OrderTransition(models.Model):
+    """
+    Append-only log of order status changes and ticket holds.
+
+    ``tickets`` lists ``{"event": id, "tier": id, "quantity": n, "revenue": "..."}``
+    lines; revenue is only known for status changes. For holds
+    (PENDING -> PENDING) the quantity is the change in tickets taken from the
+    event; for FAILED, EXPIRED and REFUND it is what was given back; for
+    CONFIRMED it is what was sold and inventory is unchanged.
+    """
+    # No database constraint, so the log outlives orders deleted by Ticket.delete.
+    order = models.ForeignKey(
+        Order, on_delete=models.DO_NOTHING, db_constraint=False, related_name="transitions"
+    )
+    from_status = models.IntegerField(choices=Order.Status.choices)
+    to_status = models.IntegerField(choices=Order.Status.choices)
+    tickets = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    @classmethod
+    def log(cls, order_id, from_status, to_status, totals):
+        """ Record a transition, buffered when inside ``batched()``. """
+        entry = cls(
+            order_id=order_id,
+            from_status=from_status,
+            to_status=to_status,
+            tickets=[
+                {
+                    "event": line["event_id"],
+                    "tier": line["tier_id"],
+                    "quantity": line["total_quantity"],
+                    "revenue": str(line["total_revenue"]) if line.get("total_revenue") is not None else None,
+                }
+                for line in totals
+            ],
+        )
+        buffer = getattr(_transition_buffer, "entries", None)
+        if buffer is None:
+            entry.save()
+        else:
+            buffer.append(entry)
+
+    @classmethod
+    def sold_revenue(cls, order_ids):
+        """
+        Revenue each order line was confirmed at, keyed by
+        ``(order_id, event_id, tier_id)``. Orders confirmed before revenue was
+        logged have no entries.
+        """
+        sold = {}
+        confirmations = cls.objects.filter(
+            order_id__in=order_ids, to_status=Order.Status.CONFIRMED
+        ).values_list("order_id", "tickets")
+        for order_id, tickets in confirmations:
+            for line in tickets:
+                if line.get("revenue") is not None:
+                    sold[order_id, line["event"], line.get("tier")] = Decimal(line["revenue"])
+        return sold
+
+    @classmethod
+    def log_hold(cls, order_id, event_id, tier_id, quantity):
+        """ Record tickets taken from (or given back to) an event by a pending order. """
+        if quantity:
+            cls.log(order_id, Order.Status.PENDING, Order.Status.PENDING,
+                    [{"event_id": event_id, "tier_id": tier_id, "total_quantity": quantity}])
+
+    @classmethod
+    @contextmanager
+    def batched(cls, batch_size=500):
+        """
+        Collect log entries and insert them with one ``bulk_create`` on exit.
+        Use it inside ``transaction.atomic()`` together with the transitions it
+        logs: on an error the buffer is dropped, which is only safe if those
+        transitions roll back as well.
+        """
+        if getattr(_transition_buffer, "entries", None) is not None:
+            yield
+            return
+        _transition_buffer.entries = []
+        try:
+            yield
+            cls.objects.bulk_create(_transition_buffer.entries, batch_size=batch_size)
+        finally:
+            _transition_buffer.entries = None
+
+    @classmethod
+    def replay(cls, events=None):
+        """
+        Rebuild the tickets held per inventory from the log, keyed by
+        ``(event_id, tier_id)`` with ``tier_id`` None for an event's own
+        counter. Only meaningful for events whose whole history was logged;
+        see ``unlogged_events``.
+        """
+        held = {}
+        entries = cls.objects.filter(
+            models.Q(to_status=Order.Status.PENDING) | models.Q(to_status__in=Order.TERMINAL)
+        ).values_list("to_status", "tickets")
+        for to_status, tickets in entries.iterator():
+            sign = -1 if to_status in Order.TERMINAL else 1
+            for line in tickets:
+                if events is None or line["event"] in events:
+                    key = (line["event"], line.get("tier"))
+                    held[key] = held.get(key, 0) + sign * line["quantity"]
+        return held
+
+    @classmethod
+    def unlogged_events(cls, events=None):
+        """ Ids of events with active tickets whose order has nothing in the log. """
+        tickets = Ticket.objects.filter(
+            order__status__in=[Order.Status.PENDING, Order.Status.CONFIRMED]
+        ).exclude(order_id__in=cls.objects.values("order_id"))
+        if events is not None:
+            tickets = tickets.filter(event_id__in=events)
+        return set(tickets.values_list("event_id", flat=True).distinct())
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.get_from_status_display()} -> {self.get_to_status_display()}"
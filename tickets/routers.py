@@ -0,0 +1,93 @@
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = "default"
+PIN_COOKIE = "pin_primary"
+
+_state = threading.local()
+
+
+def replicas():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+def allow_replica_reads(allowed=True):
+    """ Let reads in the current request go to a replica (unless pinned to the primary). """
+    _state.replica_reads = allowed
+
+
+def pin_to_primary():
+    """ Send every following read in this request to the primary. """
+    _state.pinned = True
+
+
+def has_written():
+    return getattr(_state, "wrote", False)
+
+
+def is_pinned():
+    return getattr(_state, "pinned", False) or has_written()
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+    _state.replica_reads = False
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to a replica only when a view opted in and nothing has been
+    written yet; everything else, and every write, goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if replicas() and getattr(_state, "replica_reads", False) and not is_pinned():
+            return random.choice(replicas())
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+class PrimaryPinningMiddleware:
+    """
+    Reset the routing state per request, and after a write keep the client on
+    the primary for REPLICA_PIN_SECONDS so it reads its own writes despite
+    replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset()
+        if request.COOKIES.get(PIN_COOKIE):
+            pin_to_primary()
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    PIN_COOKIE, "1",
+                    max_age=getattr(settings, "REPLICA_PIN_SECONDS", 15),
+                    httponly=True,
+                )
+            return response
+        finally:
+            reset()
+
+
+class ReplicaReadMixin:
+    """ Viewset mixin: list and retrieve may read from a replica. """
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        allow_replica_reads(self.action in self.replica_actions)
+        super().initial(request, *args, **kwargs)
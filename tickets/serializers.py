@@ -1,5 +1,7 @@
-from .models import User, Event, Ticket, Order
+from .models import User, Event, TicketTier, Ticket, Order, EventSalesDaily, ArchivedOrder, ArchivedTicket
 
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils.timezone import now
 
 from rest_framework import serializers
@@ -10,6 +12,13 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "email", "username", "password", "first_name", "last_name"]
+        # Uniqueness is enforced by the insert itself, see create().
+        extra_kwargs = {
+            "username": {"validators": []},
+            "email": {"validators": []},
+        }
+
+    UNIQUE_FIELDS = ("username", "email")
 
     def create(self, validated_data):
         user = User(
@@ -19,10 +28,68 @@ class RegisterSerializer(serializers.ModelSerializer):
             last_name=validated_data.get("last_name", ""),
         )
         user.set_password(validated_data["password"])
-        user.save()
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError as e:
+            field = self.violated_field(e)
+            if field is None:
+                raise
+            raise serializers.ValidationError({field: f"A user with that {field} already exists."})
         return user
 
+    def violated_field(self, error):
+        """
+        The unique field an IntegrityError is about. Matched on the constraint
+        name (PostgreSQL) or the column (SQLite), never on the message text,
+        which also contains the duplicate value.
+        """
+        table = User._meta.db_table
+        constraint = getattr(getattr(error.__cause__, "diag", None), "constraint_name", None)
+        for field in self.UNIQUE_FIELDS:
+            column = User._meta.get_field(field).column
+            if constraint is not None:
+                if constraint == f"{table}_{column}_key":
+                    return field
+            elif f"UNIQUE constraint failed: {table}.{column}" in str(error):
+                return field
+        return None
+
+class TicketTierSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TicketTier
+        fields = ["id", "event", "name", "price", "total_tickets", "available_tickets"]
+        read_only_fields = ["available_tickets"]
+
+    def validate_event(self, event):
+        if self.instance is not None and event != self.instance.event:
+            raise serializers.ValidationError("A tier cannot be moved to another event.")
+        return event
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            if "total_tickets" in validated_data:
+                total_tickets = TicketTier.objects.select_for_update().values_list(
+                    "total_tickets", flat=True
+                ).get(pk=instance.pk)
+                ticket_difference = validated_data["total_tickets"] - total_tickets
+                # Adjust the counter in place: reservations made since the tier
+                # was loaded must not be overwritten by a stale available_tickets.
+                adjusted = TicketTier.objects.filter(
+                    pk=instance.pk, available_tickets__gte=-ticket_difference
+                ).update(available_tickets=F("available_tickets") + ticket_difference)
+                if not adjusted:
+                    raise serializers.ValidationError({"total_tickets": "Total tickets cannot be less than already sold tickets."})
+
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            instance.save(update_fields=list(validated_data))
+        instance.refresh_from_db(fields=["available_tickets"])
+        return instance
+
 class EventSerializer(serializers.ModelSerializer):
+    tiers = TicketTierSerializer(many=True, read_only=True)
+
     class Meta:
         model = Event
         fields = "__all__"
@@ -57,14 +124,18 @@ class TicketSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def validate(self, data):
-        """ Ensure the event has enough available tickets. """
+        """ Ensure the event (or the chosen tier) has enough available tickets. """
         event = data["event"]
+        tier = data.get("tier")
         quantity = data["quantity"]
 
         if quantity < 1 or quantity > 5:
             raise serializers.ValidationError({"quantity": "You can only reserve between 1 and 5 tickets."})
-        
-        if event.available_tickets < quantity:
+
+        if tier is not None and tier.event_id != event.id:
+            raise serializers.ValidationError({"tier": f"Tier {tier.name} does not belong to event {event.name}."})
+
+        if (tier or event).available_tickets < quantity:
             raise serializers.ValidationError(
                 f"Not enough tickets available for event {event.name}."
             )
@@ -88,4 +159,23 @@ class OrderSerializer(serializers.ModelSerializer):
         for ticket_data in tickets_data:
             Ticket.objects.create(order=order, **ticket_data)
 
-        return order
\ No newline at end of file
+        return order
+
+class EventSalesDailySerializer(serializers.ModelSerializer):
+    currency = serializers.CharField(source="event.currency", read_only=True)
+
+    class Meta:
+        model = EventSalesDaily
+        fields = ["event", "day", "reserved", "sold", "refunded", "expired", "revenue", "currency"]
+
+class ArchivedTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedTicket
+        fields = ["id", "event", "tier", "user", "quantity", "ticket_price"]
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    tickets = ArchivedTicketSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ["id", "user", "status", "created_at", "archived_at", "tickets", "total_price"]
@@ -1,3 +1,565 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import shutil
+import tempfile
+import threading
 
-# Create your tests here.
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from .models import User, Event, TicketTier, Ticket, Order, OrderTransition, EventSalesDaily, ArchivedOrder
+from . import hashers
+from .holds import CacheHoldStore, LocalHoldStore, get_hold_store
+from .serializers import RegisterSerializer, TicketTierSerializer
+from .routers import PIN_COOKIE, PrimaryReplicaRouter, allow_replica_reads, reset
+
+from django.apps import apps as django_apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import override_settings
+from django.utils.timezone import now, timedelta
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+# Run with: python manage.py test --settings=django_propair.settings_test
+
+def create_event(using=None, name="Concert", total_tickets=100):
+    """ Create an event through the router, or directly in ``using``. """
+    manager = Event.objects.using(using) if using else Event.objects
+    return manager.create(
+        name=name,
+        date=now() + timedelta(days=10),
+        location="Budapest",
+        ticket_price=1000,
+        currency="HUF",
+        total_tickets=total_tickets,
+    )
+
+
+@override_settings(REPLICA_DATABASES=["replica_0"])
+class ReplicaRoutingTests(APITestCase):
+    """ The primary and the replica are separate databases, so the data tells where a read went. """
+    databases = {"default", "replica_0"}
+
+    def setUp(self):
+        self.primary_event = create_event(name="On primary")
+        self.replica_event = create_event(using="replica_0", name="On replica")
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret1"
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        reset()
+
+    def test_list_and_retrieve_read_from_replica(self):
+        response = self.client.get("/api/events/")
+        self.assertEqual([event["name"] for event in response.json()], ["On replica"])
+
+        response = self.client.get(f"/api/events/{self.replica_event.pk}/")
+        self.assertEqual(response.json()["name"], "On replica")
+
+    def test_write_pins_rest_of_request_to_primary(self):
+        router = PrimaryReplicaRouter()
+        reset()
+        allow_replica_reads()
+        self.assertEqual(router.db_for_read(Event), "replica_0")
+
+        create_event(name="Another")
+
+        self.assertEqual(router.db_for_read(Event), "default")
+
+    def test_pin_cookie_keeps_client_on_primary(self):
+        self.user.is_superuser = True
+        self.user.save()
+
+        response = self.client.patch(
+            f"/api/events/{self.primary_event.pk}/", {"location": "Debrecen"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        response = self.client.get("/api/events/")
+        self.assertEqual([event["name"] for event in response.json()], ["On primary"])
+
+        self.client.cookies.clear()
+        response = self.client.get("/api/events/")
+        self.assertEqual([event["name"] for event in response.json()], ["On replica"])
+
+    def test_reserve_uses_primary(self):
+        # A read from the replica would not find the event at all.
+        Event.objects.using("replica_0").all().delete()
+
+        response = self.client.post(
+            "/api/orders/reserve/",
+            {"tickets": [{"event": self.primary_event.pk, "quantity": 2}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.primary_event.refresh_from_db()
+        self.assertEqual(self.primary_event.available_tickets, 98)
+
+    def test_purchase_uses_primary(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(event=self.primary_event, order=order, user=self.user, quantity=1)
+
+        payment = mock.Mock(status_code=200)
+        payment.json.return_value = {"result": True}
+        with mock.patch("requests.get", return_value=payment):
+            response = self.client.post(f"/api/orders/{order.pk}/purchase/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.Status.CONFIRMED)
+
+    def test_cancel_uses_primary(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(event=self.primary_event, order=order, user=self.user, quantity=1)
+        order.confirm_order()
+
+        response = self.client.delete(f"/api/orders/{order.pk}/cancel/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.Status.REFUND)
+
+
+class ArchiveTests(APITestCase):
+
+    def test_archived_order_keeps_its_ticket_lines(self):
+        event = create_event()
+        user = User.objects.create_user(username="buyer", email="buyer@example.com", password="secret1")
+        order = Order.objects.create(user=user)
+        Ticket.objects.create(event=event, order=order, user=user, quantity=3)
+        order.confirm_order()
+        event.ticket_price = 2000
+        event.save()
+        order.refund_order()
+
+        self.assertEqual(Order.archive(now() + timedelta(seconds=1)), 1)
+
+        archived = ArchivedOrder.objects.get(pk=order.pk)
+        self.assertEqual([(line.quantity, line.ticket_price) for line in archived.tickets.all()], [(3, 1000)])
+        self.assertEqual(archived.total_price, 3000)
+
+    def test_archived_is_paginated(self):
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="secret1")
+        for pk in (1, 2, 3):
+            ArchivedOrder.objects.create(
+                id=pk, user=admin, status=Order.Status.EXPIRED,
+                created_at=now() - timedelta(days=pk), expires_at=now() - timedelta(days=pk),
+            )
+        self.client.force_authenticate(admin)
+
+        with mock.patch("tickets.views.ArchivedOrderPagination.page_size", 2):
+            first = self.client.get("/api/orders/archived/?status=expired").json()
+            second = self.client.get(first["next"]).json()
+
+        self.assertEqual([order["id"] for order in first["results"]], [1, 2])
+        self.assertEqual([order["id"] for order in second["results"]], [3])
+        self.assertIsNone(second["next"])
+
+    def test_archived_rejects_bad_filters(self):
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="secret1")
+        self.client.force_authenticate(admin)
+        for query in ("status=abc", "user=x", "id=1.5"):
+            response = self.client.get(f"/api/orders/archived/?{query}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+class TierInventoryTests(APITestCase):
+
+    def setUp(self):
+        self.event = create_event()
+        self.tier = TicketTier.objects.create(event=self.event, name="VIP", price=5000, total_tickets=2)
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="secret1")
+
+    def test_reserve_never_goes_below_zero(self):
+        stale = TicketTier.objects.get(pk=self.tier.pk)
+        self.tier.reserve_tickets(2)
+
+        with self.assertRaises(ValueError):
+            stale.reserve_tickets(1)
+        self.tier.refresh_from_db()
+        self.assertEqual(self.tier.available_tickets, 0)
+
+    def test_reconcile_and_replay_cover_tiers(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(event=self.event, tier=self.tier, order=order, user=self.user, quantity=1)
+        TicketTier.objects.filter(pk=self.tier.pk).update(available_tickets=2)
+
+        self.assertEqual(OrderTransition.replay()[(self.event.pk, self.tier.pk)], 1)
+        call_command("reconcile_inventory", "--repair", stdout=StringIO())
+        self.tier.refresh_from_db()
+        self.assertEqual(self.tier.available_tickets, 1)
+
+    def test_order_is_ended_only_once(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(event=self.event, tier=self.tier, order=order, user=self.user, quantity=2)
+        stale = Order.objects.get(pk=order.pk)
+        Order.objects.filter(pk=order.pk).update(expires_at=now() - timedelta(seconds=1))
+        stale.expires_at = now() - timedelta(seconds=1)
+
+        order.fail_order()
+        stale.expire_order()
+
+        self.tier.refresh_from_db()
+        self.assertEqual(self.tier.available_tickets, 2)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.Status.FAILED)
+
+    def test_resizing_keeps_concurrent_reservations(self):
+        stale = TicketTier.objects.get(pk=self.tier.pk)
+        self.tier.reserve_tickets(1)
+
+        serializer = TicketTierSerializer(stale, data={"total_tickets": 4}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.tier.refresh_from_db()
+        self.assertEqual((self.tier.total_tickets, self.tier.available_tickets), (4, 3))
+
+    def test_tier_cannot_shrink_below_sold_or_move(self):
+        self.tier.reserve_tickets(2)
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="secret1")
+        self.client.force_authenticate(admin)
+        other_event = create_event(name="Other")
+
+        for data in ({"total_tickets": 1}, {"event": other_event.pk}):
+            response = self.client.patch(f"/api/tiers/{self.tier.pk}/", data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.tier.refresh_from_db()
+        self.assertEqual((self.tier.event_id, self.tier.total_tickets), (self.event.pk, 2))
+
+    def test_bad_event_filter_is_rejected(self):
+        response = self.client.get("/api/tiers/?event=abc")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(APITestCase):
+
+    def setUp(self):
+        self.event = create_event()
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="secret1")
+        self.order = Order.objects.create(user=self.user)
+        Ticket.objects.create(event=self.event, order=self.order, user=self.user, quantity=2)
+        tier = TicketTier.objects.create(event=self.event, name="VIP", price=5000, total_tickets=10)
+        Ticket.objects.create(event=self.event, tier=tier, order=self.order, user=self.user, quantity=1)
+        self.empty_order = Order.objects.create(user=self.user)
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="secret1")
+        self.client.force_authenticate(admin)
+
+    def export(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode()
+
+    def test_orders_csv_counts_tickets_and_totals(self):
+        rows = list(csv.DictReader(StringIO(self.export("/api/exports/orders/"))))
+
+        self.assertEqual([row["id"] for row in rows], [str(self.order.pk), str(self.empty_order.pk)])
+        self.assertEqual((rows[0]["ticket_count"], Decimal(rows[0]["total_price"])), ("3", 7000))
+        self.assertEqual((rows[1]["ticket_count"], Decimal(rows[1]["total_price"])), ("0", 0))
+
+    def test_tickets_jsonl_filtered_by_status(self):
+        lines = self.export("/api/exports/tickets/?output=jsonl&status=pending").splitlines()
+        self.assertEqual(sorted(Decimal(json.loads(line)["ticket_price"]) for line in lines), [1000, 5000])
+
+        # Only the header is left.
+        self.assertEqual(len(self.export("/api/exports/tickets/?status=confirmed").splitlines()), 1)
+        self.assertEqual(len(self.export(f"/api/exports/orders/?since={now().date() + timedelta(days=1)}").splitlines()), 1)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/api/exports/users/").status_code, status.HTTP_404_NOT_FOUND)
+        for query in ("output=xml", "status=abc", "since=yesterday"):
+            response = self.client.get(f"/api/exports/orders/?{query}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_export_orders_command(self):
+        out = StringIO()
+        call_command("export_orders", "orders", "--output", "jsonl", "--status", "pending", stdout=out)
+        self.assertEqual([json.loads(line)["id"] for line in out.getvalue().splitlines()], [self.order.pk, self.empty_order.pk])
+
+        with self.assertRaises(CommandError):
+            call_command("export_orders", "--until", "not-a-date", stdout=StringIO())
+
+
+class SalesRollupTests(APITestCase):
+
+    def setUp(self):
+        self.event = create_event()
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="secret1")
+
+    def order_with_tickets(self, quantity):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(event=self.event, order=order, user=self.user, quantity=quantity)
+        return order
+
+    def rollup(self):
+        return EventSalesDaily.objects.get(event=self.event, day=now().date())
+
+    def test_confirm_records_sale(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order_with_tickets(2).confirm_order()
+
+        row = self.rollup()
+        self.assertEqual((row.reserved, row.sold, row.revenue), (2, 2, 2000))
+
+    def test_expire_records_expired_tickets(self):
+        order = self.order_with_tickets(2)
+        Order.objects.filter(pk=order.pk).update(expires_at=now() - timedelta(seconds=1))
+        order.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.expire_order()
+
+        row = self.rollup()
+        self.assertEqual((row.expired, row.sold, row.revenue), (2, 0, 0))
+
+    def test_refund_gives_back_the_price_paid(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.order_with_tickets(3)
+            order.confirm_order()
+        self.event.ticket_price = 2000
+        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.refund_order()
+
+        row = self.rollup()
+        self.assertEqual((row.sold, row.refunded, row.revenue), (3, 3, 0))
+        refund = OrderTransition.objects.get(order_id=order.pk, to_status=Order.Status.REFUND)
+        self.assertEqual(Decimal(refund.tickets[0]["revenue"]), 3000)
+
+    def test_backfill_fills_only_missing_rows(self):
+        self.order_with_tickets(2).confirm_order()
+        self.order_with_tickets(1)
+        self.assertFalse(EventSalesDaily.objects.exists())  # on_commit never ran
+
+        self.assertEqual(EventSalesDaily.backfill(), 1)
+        row = self.rollup()
+        self.assertEqual((row.reserved, row.sold, row.revenue), (3, 2, 2000))
+
+        EventSalesDaily.objects.filter(pk=row.pk).update(refunded=4)
+        self.assertEqual(EventSalesDaily.backfill(), 0)
+        self.assertEqual(self.rollup().refunded, 4)
+
+        call_command("backfill_sales_analytics", "--reset", stdout=StringIO())
+        self.assertEqual((self.rollup().refunded, self.rollup().sold), (0, 2))
+
+
+class TransitionLogTests(APITestCase):
+
+    def setUp(self):
+        self.event = create_event(total_tickets=10)
+        self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="secret1")
+
+    def order_with_tickets(self, quantity, user=None):
+        user = user or self.user
+        order = Order.objects.create(user=user)
+        Ticket.objects.create(event=self.event, order=order, user=user, quantity=quantity)
+        return order
+
+    def test_replay_skips_events_with_unlogged_orders(self):
+        old_order = self.order_with_tickets(4)
+        old_order.confirm_order()
+        OrderTransition.objects.filter(order_id=old_order.pk).delete()  # placed before the log existed
+        self.order_with_tickets(1, user=User.objects.create_user(username="other", email="other@example.com"))
+
+        out = StringIO()
+        call_command("replay_order_transitions", "--apply", stdout=out)
+
+        self.assertIn("skipped", out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.available_tickets, 5)
+
+    def test_seed_migration_logs_holds_of_unlogged_orders(self):
+        seed = importlib.import_module("tickets.migrations.0011_seed_order_holds")
+        old_order = self.order_with_tickets(4)
+        OrderTransition.objects.filter(order_id=old_order.pk).delete()
+
+        seed.seed_holds(django_apps, None)
+        seed.seed_holds(django_apps, None)  # Orders that have log rows are left alone.
+
+        self.assertEqual(OrderTransition.replay(), {(self.event.pk, None): 4})
+        self.assertEqual(OrderTransition.unlogged_events(), set())
+
+    def test_expiry_commits_in_batches(self):
+        orders = [
+            self.order_with_tickets(1, user=User.objects.create_user(username=f"user{n}", email=f"user{n}@example.com"))
+            for n in range(3)
+        ]
+        Order.objects.update(expires_at=now() - timedelta(seconds=1))
+        expire_order = Order.expire_order
+
+        def fail_on_last(order):
+            if order.pk == orders[-1].pk:
+                raise RuntimeError("boom")
+            expire_order(order)
+
+        with mock.patch.object(Order, "expire_order", fail_on_last), self.assertRaises(RuntimeError):
+            Order.expire_all_orders(batch_size=2)
+
+        expired = set(Order.objects.filter(status=Order.Status.EXPIRED).values_list("pk", flat=True))
+        logged = set(OrderTransition.objects.filter(to_status=Order.Status.EXPIRED).values_list("order_id", flat=True))
+        self.assertEqual(expired, {orders[0].pk, orders[1].pk})
+        self.assertEqual(logged, expired)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.available_tickets, 9)
+
+
+class ReconcileInventoryTests(APITestCase):
+
+    def setUp(self):
+        self.event = create_event(total_tickets=10)
+        user = User.objects.create_user(username="buyer", email="buyer@example.com", password="secret1")
+        order = Order.objects.create(user=user)
+        Ticket.objects.create(event=self.event, order=order, user=user, quantity=3)
+        Event.objects.filter(pk=self.event.pk).update(available_tickets=10)
+
+    def test_dry_run_only_reports(self):
+        out = StringIO()
+        call_command("reconcile_inventory", stdout=out)
+
+        self.assertIn(f"Event {self.event.pk}: available 10, expected 7", out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.available_tickets, 10)
+
+    def test_repair_fixes_drift(self):
+        out = StringIO()
+        call_command("reconcile_inventory", "--repair", "--batch-size", "1", stdout=out)
+
+        self.assertIn("repaired 1", out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.available_tickets, 7)
+
+
+class RegistrationTests(APITestCase):
+
+    def setUp(self):
+        User.objects.create_user(username="taken", email="username@example.com", password="secret1")
+
+    def register(self, username, email):
+        return self.client.post(
+            "/auth/register/", {"username": username, "email": email, "password": "secret1"}, format="json"
+        )
+
+    def test_duplicates_map_to_their_field(self):
+        response = self.register("taken", "new@example.com")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.json()), ["username"])
+
+        # The duplicate email contains "username", which must not decide the field.
+        response = self.register("new", "username@example.com")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.json()), ["email"])
+
+        self.assertEqual(self.register("new", "new@example.com").status_code, status.HTTP_201_CREATED)
+
+    def test_constraint_name_decides_on_postgresql(self):
+        cause = Exception()
+        cause.diag = mock.Mock(constraint_name="tickets_user_email_key")
+        error = IntegrityError("Key (email)=(username@x.com) already exists.")
+        error.__cause__ = cause
+        self.assertEqual(RegisterSerializer().violated_field(error), "email")
+
+    @override_settings(PASSWORD_HASHING_TIMEOUT=0)
+    def test_full_hashing_pool_answers_503(self):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch.object(hashers, "_executor", mock.Mock()), mock.patch.object(hashers, "_slots", slots):
+            with self.assertRaises(hashers.PasswordHashingBusy):
+                hashers.run_in_pool(len, "pw")
+
+        self.assertEqual(hashers.PasswordHashingBusy.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(hashers.run_in_pool(len, "pw"), 2)
+
+
+@override_settings(HOLD_STORE_ALLOW_LOCAL=True)
+class LocalHoldStoreTests(APITestCase):
+
+    def test_pop_expired_in_deadline_order(self):
+        store = LocalHoldStore()
+        moment = now()
+        store.add(1, moment - timedelta(minutes=2))
+        store.add(2, moment - timedelta(minutes=1))
+        store.add(3, moment + timedelta(minutes=1))
+        store.add(2, moment + timedelta(minutes=2))  # extended: the old heap entry is stale
+        store.add(4, moment - timedelta(minutes=3))
+        store.remove(4)
+
+        self.assertEqual(store.pop_expired(moment), [1])
+        self.assertIsNone(store.deadline(1))
+        self.assertEqual(store.pop_expired(moment), [])
+        self.assertEqual(store.pop_expired(moment + timedelta(minutes=5)), [3, 2])
+
+    @override_settings(HOLD_STORE_ALLOW_LOCAL=False)
+    def test_refused_outside_tests_and_stress_harness(self):
+        with self.assertRaises(ImproperlyConfigured):
+            LocalHoldStore()
+
+
+class CacheHoldStoreTests(APITestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        caches_setting = override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "holds": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory},
+        }, HOLD_STORE_CACHE="holds")
+        caches_setting.enable()
+        self.addCleanup(caches_setting.disable)
+        self.store = CacheHoldStore()
+
+    def test_buckets_cursor_and_readded_deadlines(self):
+        moment = now()
+        self.store.add(1, moment - timedelta(minutes=5))
+        self.store.add(2, moment + timedelta(minutes=10))
+        self.store.add(3, moment - timedelta(minutes=5))
+        self.store.add(3, moment + timedelta(minutes=10))  # re-added with a later deadline
+        self.store.add(4, moment - timedelta(minutes=4))
+        self.store.remove(4)
+
+        self.assertEqual(self.store.pop_expired(moment), [1])
+        self.assertIsNone(self.store.deadline(1))
+        # The cursor has moved past the popped buckets.
+        self.assertEqual(self.store.pop_expired(moment), [])
+        self.assertEqual(sorted(self.store.pop_expired(moment + timedelta(minutes=20))), [2, 3])
+
+    @override_settings(HOLD_STORE_CACHE="default")
+    def test_per_process_cache_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CacheHoldStore()
+
+
+class ExpireAllOrdersTests(APITestCase):
+
+    def setUp(self):
+        self.event = create_event()
+        self.orders = []
+        for n in range(2):
+            user = User.objects.create_user(username=f"user{n}", email=f"user{n}@example.com")
+            order = Order.objects.create(user=user)
+            Ticket.objects.create(event=self.event, order=order, user=user, quantity=1)
+            self.orders.append(order)
+        Order.objects.update(expires_at=now() - timedelta(seconds=1))
+
+    def statuses(self):
+        return [Order.objects.get(pk=order.pk).status for order in self.orders]
+
+    def test_without_store_scans_the_database(self):
+        Order.expire_all_orders()
+        self.assertEqual(self.statuses(), [Order.Status.EXPIRED] * 2)
+
+    @override_settings(HOLD_STORE_BACKEND="tickets.holds.LocalHoldStore", HOLD_STORE_ALLOW_LOCAL=True)
+    def test_with_store_expires_what_the_store_reports(self):
+        # Only the first hold is known to the store, as if the second predated it.
+        get_hold_store().add(self.orders[0].pk, now() - timedelta(seconds=1))
+
+        Order.expire_all_orders()
+        self.assertEqual(self.statuses(), [Order.Status.EXPIRED, Order.Status.PENDING])
+
+        Order.expire_all_orders(full_scan=True)
+        self.assertEqual(self.statuses(), [Order.Status.EXPIRED] * 2)
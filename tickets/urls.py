@@ -1,4 +1,4 @@
-from .views import EventViewSet, TicketViewSet, RegisterView, OrderViewSet, PaymentViewSet
+from .views import EventViewSet, TicketTierViewSet, TicketViewSet, RegisterView, OrderViewSet, PaymentViewSet, ExportView, SalesAnalyticsViewSet
 
 from django.urls import path, include
 
@@ -10,12 +10,15 @@ from rest_framework_simplejwt.views import (
 
 router = DefaultRouter()
 router.register(r'events', EventViewSet)
+router.register(r'tiers', TicketTierViewSet)
 router.register(r'tickets', TicketViewSet)
 router.register(r'orders', OrderViewSet)
+router.register(r'analytics/sales', SalesAnalyticsViewSet)
 
 urlpatterns = [
     path('api/', include(router.urls)),
     path('api/payments/', PaymentViewSet.as_view(), name='payment-process'),
+    path('api/exports/<str:kind>/', ExportView.as_view(), name='export'),
     path('auth/register/', RegisterView.as_view(), name="register"),
     path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
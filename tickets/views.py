@@ -1,30 +1,49 @@
 import random
-import requests
 
-from .models import User, Event, Ticket, Order
-from .serializers import EventSerializer, TicketSerializer, OrderSerializer, RegisterSerializer
+from .models import User, Event, TicketTier, Ticket, Order, EventSalesDaily, ArchivedOrder
+from .serializers import EventSerializer, TicketTierSerializer, TicketSerializer, OrderSerializer, RegisterSerializer, EventSalesDailySerializer, ArchivedOrderSerializer
 from .permissions import IsAdminOrReadOnly, IsAdminOrOwner, OnlyGetMethod, DisableMethodsPermission
+from .routers import ReplicaReadMixin
+from .exports import EXPORT_KINDS, EXPORT_FORMATS, export_lines, parse_status, parse_moment
 
 from django.db import transaction
-from django.utils.timezone import now
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
 
 from rest_framework import viewsets, generics, status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
 
-class EventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.all()
+class EventViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = Event.objects.prefetch_related("tiers")
     serializer_class = EventSerializer
     permission_classes = [IsAdminOrReadOnly]
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketTierViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = TicketTier.objects.all()
+    serializer_class = TicketTierSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get_queryset(self):
+        """Optionally filter by ?event=."""
+        queryset = super().get_queryset()
+        event = self.request.query_params.get("event")
+        if event:
+            try:
+                queryset = queryset.filter(event_id=int(event))
+            except ValueError as e:
+                raise ValidationError({"error": str(e)})
+        return queryset
+
+class TicketViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Ticket.objects.all()
     serializer_class = TicketSerializer
     permission_classes = [IsAuthenticated, IsAdminOrOwner, OnlyGetMethod]
@@ -38,7 +57,13 @@ class TicketViewSet(viewsets.ModelViewSet):
         return Ticket.objects.filter(user=user)
     
 
-class OrderViewSet(viewsets.ModelViewSet):
+class ArchivedOrderPagination(CursorPagination):
+    """The archive grows without bound, so it is always read a page at a time."""
+    page_size = 100
+    ordering = ("-created_at", "-id")
+
+
+class OrderViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsAdminOrOwner, DisableMethodsPermission]
@@ -49,6 +74,24 @@ class OrderViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return Order.objects.all()
         return Order.objects.filter(user=user)
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def archived(self, request):
+        """ Failed, expired and refunded orders moved out by archive_orders (admin only). """
+        queryset = ArchivedOrder.objects.prefetch_related("tickets")
+        params = request.query_params
+        try:
+            for param in ("id", "user"):
+                if params.get(param):
+                    queryset = queryset.filter(**{param: int(params[param])})
+            if params.get("status"):
+                queryset = queryset.filter(status=parse_status(params["status"]))
+        except ValueError as e:
+            raise ValidationError({"error": str(e)})
+
+        paginator = ArchivedOrderPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(ArchivedOrderSerializer(page, many=True).data)
     
     @action(detail=False, methods=["post"])
     def reserve(self, request):
@@ -59,15 +102,16 @@ class OrderViewSet(viewsets.ModelViewSet):
         if not tickets_data:
             return Response({"error": "No tickets provided."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Find or create a pending order
-        order = Order.objects.filter(user=user, status=Order.Status.PENDING).first()
-        if not order:
-            order = Order.objects.create(user=user)
-
         valid_tickets = []
         errors = []
 
         with transaction.atomic():
+            # Find or create a pending order, locked so that a payment or the
+            # expiry sweep cannot end it while tickets are being added.
+            order = Order.objects.select_for_update().filter(user=user, status=Order.Status.PENDING).first()
+            if not order:
+                order = Order.objects.create(user=user)
+
             for ticket_data in tickets_data:
                 try:
                     event = Event.objects.get(id=ticket_data["event"])
@@ -78,9 +122,11 @@ class OrderViewSet(viewsets.ModelViewSet):
                 quantity = ticket_data["quantity"]
 
                 # Check if the user already has a reservation for this event
-                existing_ticket = Ticket.objects.filter(order=order, event=event, user=user).first()
+                existing_ticket = Ticket.objects.filter(
+                    order=order, event=event, user=user, tier_id=ticket_data.get("tier")
+                ).first()
                 if existing_ticket:
-                    if now() >= order.expires_at:
+                    if order.hold_expired():
                         order.expire_order()
                         return Response({"message": "Order expired."}, status=status.HTTP_204_NO_CONTENT)
                     if quantity == 0:
@@ -109,6 +155,8 @@ class OrderViewSet(viewsets.ModelViewSet):
                         valid_tickets.append(ticket)
                     except ValidationError as e:
                         errors.append({"event": event.name, "error": e.detail})
+                    except ValueError as e:  # Sold out since validation
+                        errors.append({"event": event.name, "error": str(e)})
 
         if valid_tickets:
             return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
@@ -118,13 +166,17 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def purchase(self, request, pk=None):
         """Call the internal payment API and confirm or fail the order."""
+        # Imported here so importing the views does not pull in requests itself;
+        # rest_framework.compat still imports it, so workers load it either way.
+        import requests
+
         order = self.get_object()
         if order.status != Order.Status.PENDING:
             return Response(
                 {"error": "Order is not pending, cannot process payment."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if now() >= order.expires_at:
+        if order.hold_expired():
             order.expire_order()
             return Response({"message": "Order expired."}, status=status.HTTP_204_NO_CONTENT)
         try:
@@ -133,7 +185,11 @@ class OrderViewSet(viewsets.ModelViewSet):
             response_data = response.json()
 
             if response.status_code == 200 and response_data.get("result"):
-                order.confirm_order()
+                if not order.confirm_order():
+                    return Response(
+                        {"error": "Order is not pending, cannot process payment."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
                 return Response({"message": "Payment successful, order confirmed!"}, status=status.HTTP_200_OK)
             else:
                 order.fail_order()
@@ -153,18 +209,95 @@ class OrderViewSet(viewsets.ModelViewSet):
         """ Cancel an order (delete). """
         order = self.get_object()
 
-        if order.status != Order.Status.CONFIRMED:
+        if not order.refund_order():
             return Response({"error": "Only confirmed orders can be canceled."}, status=status.HTTP_400_BAD_REQUEST)
 
-        order.refund_order()
-
         return Response({"message": "Order canceled and tickets refunded."}, status=status.HTTP_200_OK)
 
 
+class SalesAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Daily sales rollups per event (admin only)."""
+    queryset = EventSalesDaily.objects.select_related("event")
+    serializer_class = EventSalesDailySerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        """Filter by ?event=, ?since= and ?until= (ISO dates)."""
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        try:
+            if params.get("event"):
+                queryset = queryset.filter(event_id=int(params["event"]))
+            if params.get("since"):
+                queryset = queryset.filter(day__gte=parse_moment(params["since"]).date())
+            if params.get("until"):
+                queryset = queryset.filter(day__lte=parse_moment(params["until"]).date())
+        except ValueError as e:
+            raise ValidationError({"error": str(e)})
+        return queryset
+
+    @action(detail=False, methods=["get"])
+    def totals(self, request):
+        """Sum the daily rows per event over the requested range."""
+        totals = (
+            self.get_queryset()
+            .values("event", "event__name", "event__currency")
+            .annotate(
+                reserved=Sum("reserved"),
+                sold=Sum("sold"),
+                refunded=Sum("refunded"),
+                expired=Sum("expired"),
+                revenue=Sum("revenue"),
+            )
+            .order_by("event")
+        )
+        return Response([
+            {
+                "event": row["event"],
+                "name": row["event__name"],
+                "currency": row["event__currency"],
+                "reserved": row["reserved"],
+                "sold": row["sold"],
+                "refunded": row["refunded"],
+                "expired": row["expired"],
+                "revenue": row["revenue"],
+            }
+            for row in totals
+        ])
+
+
 class PaymentViewSet(APIView):
     """Handles payment processing"""
 
     def get(self, *args, **kwargs):
         """Simulate payment processing and return success or failure."""
         result = random.choice([True, False])
-        return Response({"result": result}, status=status.HTTP_200_OK)       
+        return Response({"result": result}, status=status.HTTP_200_OK)
+
+
+class ExportView(APIView):
+    """Stream orders or tickets as CSV or JSON lines for reporting (admin only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, kind):
+        if kind not in EXPORT_KINDS:
+            return Response({"error": f"Unknown export: {kind}."}, status=status.HTTP_404_NOT_FOUND)
+
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"Output must be one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            order_status = parse_status(request.query_params.get("status"))
+            since = parse_moment(request.query_params.get("since"))
+            until = parse_moment(request.query_params.get("until"), end_of_day=True)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(
+            export_lines(kind, fmt, status=order_status, since=since, until=until),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{kind}.{fmt}"'
+        return response